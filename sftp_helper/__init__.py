@@ -2,7 +2,7 @@
 SFTP Helper
 
 This module provides functions to interact with an SFTP server, allowing users to perform file uploads, downloads, 
-and deletions, as well as to check file existence remotely. The module relies on pysftp for SFTP operations and 
+and deletions, as well as to check file existence remotely. The module relies on paramiko for SFTP operations and 
 os_helper for auxiliary tasks.
 
 Authors:
@@ -14,6 +14,8 @@ Authors:
 __all__ = [
     'credentials',
     'get_client_sftp',
+    'Session',
+    'close_all',
     'strip_sftp_path',
     'remote_file_exists',
     'delete',
@@ -21,11 +23,20 @@ __all__ = [
     'download',
     'remote_dir_exist',
     'make_remote_directory',
+    'remote_files_exist',
+    'remote_files_exist_in',
+    'delete_many',
+    'upload_many',
+    'download_many',
+    'upload_archive',
+    'AsyncSFTP',
 ]
 
 from .main import (
     credentials,
     get_client_sftp,
+    Session,
+    close_all,
     strip_sftp_path,
     remote_file_exists,
     delete,
@@ -33,5 +44,12 @@ from .main import (
     download,
     remote_dir_exist,
     make_remote_directory,
+    remote_files_exist,
+    remote_files_exist_in,
+    delete_many,
+    upload_many,
+    download_many,
+    upload_archive,
 )
+from .async_main import AsyncSFTP
 
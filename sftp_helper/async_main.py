@@ -0,0 +1,236 @@
+"""
+SFTP Helper (asyncio)
+
+Asynchronous counterpart of the main module, built on asyncssh: a single SSH connection
+multiplexes many concurrent SFTP transfers from one event loop, without threads.
+
+Authors:
+- [Warith Harchaoui](https://harchaoui.org/warith)
+- [Mohamed Chelali](https://mchelali.github.io)
+- [Bachir Zerroug](https://www.linkedin.com/in/bachirzerroug)
+
+Dependencies:
+- asyncssh (optional): asyncio SSH/SFTP client, https://pypi.org/project/asyncssh/
+- osh: Custom helper functions for file and system operations
+"""
+
+import os_helper as osh
+import asyncio
+import logging
+import os
+
+from .main import _BLOCK_SIZE, _MAX_CHANNELS, _MAX_CONCURRENT_REQUESTS, _READ_BLOCK_SIZE, _SSH_PORT, _default_sftp_address, strip_sftp_path
+
+
+class AsyncSFTP:
+    """
+    Asynchronous SFTP session over one asyncssh connection.
+
+    Every coroutine of an open session shares the same SSH connection, so transfers
+    started together with `asyncio.gather` run concurrently on separate SFTP requests.
+    Each transfer itself keeps up to 64 requests in flight, as the main module does:
+    writes of `sftp_block_size` bytes (default 131072), reads of 64 KiB.
+
+    Parameters
+    ----------
+    cred : dict
+        SFTP credentials dictionary.
+
+    Example
+    -------
+    >>> async with AsyncSFTP(cred) as s:
+    ...     await asyncio.gather(*(s.upload_async(p) for p in paths))
+
+    Raises
+    ------
+    ImportError
+        If asyncssh is not installed.
+    """
+
+    def __init__(self, cred: dict):
+        try:
+            import asyncssh  # lazy, so importing sftp_helper does not load it
+        except ImportError:
+            raise ImportError("AsyncSFTP requires asyncssh:\n\tpip install asyncssh")
+        self._asyncssh = asyncssh
+        self._cred = cred
+        self._conn = None
+        self._sftp = None
+
+    async def __aenter__(self):
+        cred = self._cred
+        kwargs = {}
+        if cred.get("sftp_private_key"):
+            kwargs["client_keys"] = [os.path.expanduser(cred["sftp_private_key"])]
+            kwargs["passphrase"] = cred.get("sftp_private_key_pass")
+        try:
+            # known_hosts=None: the server host key is not checked, as in the main module
+            self._conn = await self._asyncssh.connect(
+                cred["sftp_host"], port=_SSH_PORT, username=cred["sftp_login"],
+                password=cred["sftp_passwd"], known_hosts=None, **kwargs
+            )
+            self._sftp = await self._conn.start_sftp_client()
+        except Exception as err:
+            if self._conn is not None:
+                self._conn.close()
+            raise Exception(f"Failed to establish SFTP connection:\n\tsftp://{cred['sftp_login']}@{cred['sftp_host']}\nError: {str(err)}")
+        return self
+
+    async def __aexit__(self, etype, value, traceback):
+        self._sftp.exit()
+        self._conn.close()
+        await self._conn.wait_closed()
+
+    def _transfer_options(self, block_size: int) -> dict:
+        """
+        Request size and pipelining depth of asyncssh transfers.
+        """
+        return {
+            "block_size": block_size,
+            "max_requests": _MAX_CONCURRENT_REQUESTS,
+        }
+
+    async def _bounded(self, task, items: list) -> list:
+        """
+        Await `task(*item)` for every item, at most `sftp_parallel` (default 8) at once, like `_fan_out`.
+
+        Each running transfer holds a remote file handle and its in-flight requests,
+        so large batches must not open them all together.
+        """
+        semaphore = asyncio.Semaphore(max(1, int(self._cred.get("sftp_parallel", _MAX_CHANNELS))))
+
+        async def run(item):
+            async with semaphore:
+                return await task(*item)
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+    async def _already_uploaded(self, remote_path: str, size: int) -> bool:
+        """
+        Whether `remote_path` already holds a file of `size` bytes.
+        """
+        try:
+            return (await self._sftp.stat(remote_path)).size == size
+        except self._asyncssh.SFTPNoSuchFile:
+            return False
+
+    async def upload_async(self, local_path: str, sftp_address: str = "") -> str:
+        """
+        Upload a local file, like `upload`.
+
+        Parameters
+        ----------
+        local_path : str
+            Path to the local file.
+        sftp_address : str, optional
+            Remote SFTP destination path. If not provided, a hash-based path is generated
+            and the transfer is skipped when that file is already on the server.
+
+        Returns
+        -------
+        str
+            The remote path if upload is successful.
+        """
+        content_addressed = osh.emptystring(sftp_address)
+        if content_addressed:
+            # Hashing reads the whole file: done in a thread so concurrent transfers keep running
+            sftp_address = await asyncio.to_thread(_default_sftp_address, local_path, self._cred)
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+
+        try:
+            local_stat = os.stat(local_path)
+            if content_addressed and await self._already_uploaded(remote_path, local_stat.st_size):
+                logging.info(f"Already uploaded: {local_path} -> {sftp_address}")
+                return sftp_address
+            await self._sftp.put(local_path, remote_path, **self._transfer_options(int(self._cred.get("sftp_block_size", _BLOCK_SIZE))))
+            await self._sftp.utime(remote_path, (local_stat.st_atime, local_stat.st_mtime))
+            logging.info(f"Upload successful: {local_path} -> {sftp_address}")
+            return sftp_address
+        except Exception as err:
+            raise Exception(f"Upload failed:\n\t{local_path}\n\t->{sftp_address}.\nError:\n\t{str(err)}")
+
+    async def download_async(self, sftp_address: str, local_path: str = "") -> str:
+        """
+        Download a remote file, like `download`.
+
+        Parameters
+        ----------
+        sftp_address : str
+            The full SFTP path to the remote file.
+        local_path : str, optional
+            Local destination path. If not provided, the remote basename is used.
+
+        Returns
+        -------
+        str
+            The local path if download is successful.
+        """
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+        if osh.emptystring(local_path):
+            local_path = remote_path.split('/')[-1]
+
+        try:
+            remote_stat = await self._sftp.stat(remote_path)
+            await self._sftp.get(remote_path, local_path, **self._transfer_options(_READ_BLOCK_SIZE))
+            os.utime(local_path, (remote_stat.atime, remote_stat.mtime))
+            osh.checkfile(local_path, msg=f"Download failed for {sftp_address}")
+            logging.info(f"Download successful: {sftp_address} -> {local_path}")
+            return local_path
+        except Exception as err:
+            raise Exception(f"Download failed:\n\t{sftp_address}\n\t->{local_path}.\nError:\n\t{str(err)}")
+
+    async def delete_async(self, sftp_address: str) -> bool:
+        """
+        Delete a remote file, like `delete`.
+
+        Parameters
+        ----------
+        sftp_address : str
+            The full SFTP path to the file.
+
+        Returns
+        -------
+        bool
+            True if the file was successfully deleted or didn't exist.
+        """
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+        try:
+            await self._sftp.remove(remote_path)
+            logging.info(f"SFTP file {sftp_address} successfully deleted.")
+        except self._asyncssh.SFTPNoSuchFile:
+            logging.info(f"SFTP remote file {remote_path} does not exist, skipping deletion.")
+        except Exception as err:
+            raise Exception(f"Failed to delete SFTP file:\n\t{sftp_address}.\nError:\n\t{str(err)}")
+        return True
+
+    async def upload_many_async(self, pairs: list[tuple[str, str]]) -> list[str]:
+        """
+        Upload many local files concurrently, like `upload_many`, at most `sftp_parallel` (default 8) at once.
+
+        Parameters
+        ----------
+        pairs : list[tuple[str, str]]
+            (local_path, sftp_address) pairs, as in `upload_async`.
+
+        Returns
+        -------
+        list[str]
+            The remote address of each uploaded file, in the order of `pairs`.
+        """
+        return await self._bounded(self.upload_async, pairs)
+
+    async def download_many_async(self, pairs: list[tuple[str, str]]) -> list[str]:
+        """
+        Download many remote files concurrently, like `download_many`, at most `sftp_parallel` (default 8) at once.
+
+        Parameters
+        ----------
+        pairs : list[tuple[str, str]]
+            (sftp_address, local_path) pairs, as in `download_async`.
+
+        Returns
+        -------
+        list[str]
+            The local path of each downloaded file, in the order of `pairs`.
+        """
+        return await self._bounded(self.download_async, pairs)
@@ -2,7 +2,7 @@
 SFTP Helper
 
 This module provides functions to interact with an SFTP server, allowing users to perform file uploads, downloads, 
-and deletions, as well as to check file existence remotely. The module relies on pysftp for SFTP operations and 
+and deletions, as well as to check file existence remotely. The module relies on paramiko for SFTP operations and 
 osh for auxiliary tasks.
 
 Authors:
@@ -11,14 +11,154 @@ Authors:
 - [Bachir Zerroug](https://www.linkedin.com/in/bachirzerroug)
 
 Dependencies:
-- pysftp: Python SFTP client, https://pypi.org/project/pysftp/
+- paramiko: Python SSH/SFTP client, https://pypi.org/project/paramiko/
 - osh: Custom helper functions for file and system operations
 """
 
-import pysftp
+from __future__ import annotations
+
 import os_helper as osh
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
+from pathlib import PurePosixPath
+import atexit
+import functools
 import logging
+import mmap
+import os
+import random
+import shlex
+import shutil
+import socket
+import stat
+import tarfile
+import threading
+import time
+from typing import TYPE_CHECKING
+
+# paramiko (and the cryptography stack behind it) is imported lazily, at first
+# connection, so that importing this module stays cheap for short-lived scripts
+if TYPE_CHECKING:
+    import paramiko
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+
+# Idle connections kept alive between calls, keyed by (host, login, compression).
+# Each entry is a list of (connection, last_release_time), most recent last.
+_POOL: dict[tuple[str, str, bool], list[tuple[paramiko.SFTPClient, float]]] = {}
+_POOL_LOCK = threading.Lock()
+
+# Seconds after which an idle pooled connection is closed instead of reused
+_POOL_IDLE_TIMEOUT = 300
+
+# Idle connections kept per pool key; bursts of concurrent callers open more,
+# the least recently used surplus is closed when they are handed back
+_POOL_MAX_IDLE = 4
+
+_SSH_PORT = 22
+
+# SSH channel flow control: a large window keeps the link busy on high-latency
+# connections; packets stay at 32 KiB, which every SSH server accepts
+_WINDOW_SIZE = 2 ** 27
+_MAX_PACKET_SIZE = 2 ** 15
+
+# Outstanding SFTP read requests per download (as OpenSSH sftp and pkg/sftp do)
+_MAX_CONCURRENT_REQUESTS = 64
+
+# Default size of each SFTP write request (paramiko uses 32 KiB): fewer, larger
+# requests mean fewer packets to encrypt and acknowledge
+_BLOCK_SIZE = 128 << 10
+
+# Size of each SFTP read request: sftp-server before OpenSSH 8.6 caps reads at 64 KiB,
+# and a short reply to a larger request makes paramiko stop prefetching the file
+_READ_BLOCK_SIZE = 64 << 10
+
+# Seconds between SSH keepalive packets, so idle pooled sessions are not dropped
+_KEEPALIVE_INTERVAL = 30
+
+# Handshake attempts before giving up; servers throttling concurrent handshakes
+# (OpenSSH MaxStartups) drop the extra ones, which a later attempt usually gets through
+_CONNECT_ATTEMPTS = 5
+
+# SFTP channels opened on one SSH connection by the batch functions
+# (OpenSSH servers allow 10 sessions per connection by default)
+_MAX_CHANNELS = 8
+
+
+# Optional credentials keys; file configs pass them through as is, environment
+# configs only return the required keys, so these are looked up separately
+_OPTIONAL_KEYS = [
+    'sftp_private_key', 'sftp_private_key_pass', 'sftp_tcp_sndbuf', 'sftp_tcp_rcvbuf',
+    'sftp_block_size', 'sftp_parallel', 'sftp_compress', 'sftp_delete_before_put',
+    'sftp_use_agent',
+]
+
+
+# Parsed credentials, keyed by config path: config_path -> (credentials, config mtime)
+_CREDENTIALS_CACHE: dict[str, tuple[dict, float]] = {}
+_CREDENTIALS_LOCK = threading.Lock()
+# Config paths currently being re-read in the background
+_CREDENTIALS_REFRESHING: set[str] = set()
+
+
+def _config_mtime(config_path: str) -> float:
+    """
+    Modification time of the config path, None for environment-based configs or missing paths.
+
+    For a folder, this is the latest modification time among the folder itself (files
+    added or removed) and the JSON/YAML files `osh.get_config` may pick in it, since
+    editing a file in place does not change the folder's own modification time.
+    """
+    if config_path is None:
+        return None
+    try:
+        mtime = os.path.getmtime(config_path)
+        if os.path.isdir(config_path):
+            for entry in os.scandir(config_path):
+                if entry.name.lower().endswith(('.json', '.yaml', '.yml')):
+                    mtime = max(mtime, entry.stat().st_mtime)
+        return mtime
+    except OSError:
+        return None
+
+
+def _load_credentials(config_path: str) -> dict:
+    """
+    Parse the configuration and store it in the credentials cache.
+    """
+    keys = ['sftp_host', 'sftp_login', 'sftp_passwd', 'sftp_destination_path', 'sftp_https']
+    mtime = _config_mtime(config_path)  # taken before reading so a concurrent edit is seen next time
+    cred = osh.get_config(keys, "SFTP", config_path)
+    for key in _OPTIONAL_KEYS:
+        # Same lookup as get_config for environment variables: capitals first, then the exact key
+        if key not in cred and (key.upper() in os.environ or key in os.environ):
+            cred[key] = os.environ.get(key.upper(), os.environ.get(key))
+    with _CREDENTIALS_LOCK:
+        _CREDENTIALS_CACHE[config_path] = (cred, mtime)
+    return cred
+
+
+def _refresh_credentials(config_path: str):
+    """
+    Background re-read of a changed configuration; the stale value stays cached on failure.
+
+    The failed modification time is then recorded, so the same broken configuration
+    is not re-read (and reported) again until it changes.
+    """
+    mtime = _config_mtime(config_path)
+    try:
+        _load_credentials(config_path)
+    except BaseException as err:  # get_config exits on invalid configurations
+        logging.warning(f"Failed to reload SFTP configuration {config_path}, keeping the previous one.\nError: {str(err)}")
+        with _CREDENTIALS_LOCK:
+            _CREDENTIALS_CACHE[config_path] = (_CREDENTIALS_CACHE[config_path][0], mtime)
+    finally:
+        with _CREDENTIALS_LOCK:
+            _CREDENTIALS_REFRESHING.discard(config_path)
 
 
 def credentials(config_path: str=None) -> dict:
@@ -27,6 +167,25 @@ def credentials(config_path: str=None) -> dict:
 
     This function loads SFTP credentials from a given config path (file or folder). 
     It expects certain mandatory keys in the configuration file.
+    Key-based authentication can be enabled by adding `sftp_private_key`
+    (path to the key file) and optionally `sftp_private_key_pass` to the result;
+    the keys of a running SSH agent are tried when `sftp_passwd` is empty, or before
+    it when the `sftp_use_agent` flag is set.
+    TCP socket buffer sizes (bytes) can be pinned with `sftp_tcp_sndbuf` and `sftp_tcp_rcvbuf`
+    (by default the kernel sizes them),
+    the size of SFTP write requests with `sftp_block_size` (default 131072), and the
+    number of parallel transfers of the batch functions with `sftp_parallel` (default 8).
+    Setting `sftp_compress` enables SSH (zlib) compression, worth it for text-like
+    data on slow links, and `sftp_delete_before_put` makes uploads remove the previous
+    remote file instead of truncating it, for servers without truncate semantics.
+    These optional keys are read from the configuration file, or else from the
+    environment variables in capitals (e.g. `SFTP_BLOCK_SIZE`); flags accept
+    true/false, yes/no, on/off or 1/0.
+
+    The parsed configuration is cached per `config_path`. When the modification
+    time of `config_path` changes, the cached (stale) credentials are returned
+    immediately while the configuration is re-read in a background thread, so
+    callers never block on parsing after the first call.
 
     Parameters
     ----------
@@ -43,17 +202,315 @@ def credentials(config_path: str=None) -> dict:
     SystemExit
         If the configuration file does not contain the required keys (or not present in capitals in the environment variables).
     """
-    keys = ['sftp_host', 'sftp_login', 'sftp_passwd', 'sftp_destination_path', 'sftp_https']
-    return osh.get_config(keys, "SFTP", config_path)
+    with _CREDENTIALS_LOCK:
+        cached = _CREDENTIALS_CACHE.get(config_path)
+    if cached is None:
+        return dict(_load_credentials(config_path))
+
+    cred, mtime = cached
+    if _config_mtime(config_path) != mtime:
+        with _CREDENTIALS_LOCK:
+            refresh = config_path not in _CREDENTIALS_REFRESHING
+            _CREDENTIALS_REFRESHING.add(config_path)
+        if refresh:
+            threading.Thread(target=_refresh_credentials, args=(config_path,), daemon=True).start()
+    return dict(cred)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_private_key(path: str, passphrase: str = None) -> paramiko.PKey:
+    """
+    Parse a private key file once; later handshakes reuse the decoded key.
+    """
+    import paramiko  # lazy, see module imports
+    return paramiko.PKey.from_path(os.path.expanduser(path), passphrase)
+
+
+def _authenticate_agent(transport: paramiko.Transport, login: str) -> bool:
+    """
+    Try the keys of a running SSH agent, returning whether one was accepted.
+
+    Servers disconnect after a few failed attempts (OpenSSH MaxAuthTries, 6 by default),
+    so the keys stop being tried as soon as the session is gone.
+    """
+    import paramiko  # lazy, see module imports
+    agent = paramiko.Agent()
+    try:
+        for key in agent.get_keys():
+            if not transport.is_active():
+                break
+            try:
+                transport.auth_publickey(login, key)
+                return True
+            except paramiko.AuthenticationException:
+                continue
+            except paramiko.SSHException:  # "No existing session": dropped by the server
+                break
+    finally:
+        agent.close()
+    return False
+
+
+def _open_socket(cred: dict) -> socket.socket:
+    """
+    TCP connection to the server, with Nagle disabled.
+
+    The socket buffers are left to the kernel unless the optional `sftp_tcp_sndbuf` /
+    `sftp_tcp_rcvbuf` credentials are given: on Linux an explicit size turns off TCP
+    autotuning for the socket and is capped by net.core.wmem_max / rmem_max, often
+    below what autotuning reaches on long fat pipes.
+    """
+    buffers = []
+    for option, key in [(socket.SO_SNDBUF, "sftp_tcp_sndbuf"), (socket.SO_RCVBUF, "sftp_tcp_rcvbuf")]:
+        if cred.get(key) not in (None, ""):
+            buffers.append((option, int(cred[key])))
+
+    error = OSError(f"Could not resolve {cred['sftp_host']}")
+    for family, kind, proto, _, address in socket.getaddrinfo(cred["sftp_host"], _SSH_PORT, type=socket.SOCK_STREAM):
+        sock = socket.socket(family, kind, proto)
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            # Buffers are set before connecting so the TCP window scale can use them
+            for option, size in buffers:
+                sock.setsockopt(socket.SOL_SOCKET, option, size)
+            sock.connect(address)
+            return sock
+        except OSError as err:
+            sock.close()
+            error = err
+    raise error
+
+
+def _flag(cred: dict, key: str) -> bool:
+    """
+    Value of an optional boolean credential, False when absent.
+
+    Environment variables (and some config files) give strings, where "false" or "0" must stay False.
+    """
+    value = cred.get(key, False)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def _compression(cred: dict) -> bool:
+    """
+    Whether SSH compression is requested, through the optional `sftp_compress` credential.
+    """
+    return _flag(cred, "sftp_compress")
+
+
+def _start_transport(cred: dict) -> paramiko.Transport:
+    """
+    Perform one SSH handshake, without authentication.
+    """
+    import paramiko  # lazy, see module imports
+    transport = paramiko.Transport(
+        _open_socket(cred),
+        default_window_size=_WINDOW_SIZE,
+        default_max_packet_size=_MAX_PACKET_SIZE,
+    )
+    # Off by default: zlib costs CPU and does not help on already compressed payloads;
+    # worth it for text-like data (logs, CSV, JSON) over links slower than ~200 MB/s
+    transport.use_compression(_compression(cred))
+    try:
+        # The server host key is not checked, for simplicity
+        transport.start_client()
+        return transport
+    except BaseException:
+        transport.close()
+        raise
+
+
+def _open(cred: dict) -> paramiko.SFTPClient:
+    """
+    Perform one SSH handshake, authenticate and open an SFTP session on it.
+
+    An explicit `sftp_private_key` (optionally protected by `sftp_private_key_pass`)
+    is used when present in the credentials. Otherwise the password is used; the keys
+    of a running SSH agent are tried first only when there is no password or when the
+    `sftp_use_agent` flag is set. If the server dropped the session after too many
+    rejected agent keys, the password is sent on a fresh connection.
+    """
+    import paramiko  # lazy, see module imports
+    login = cred["sftp_login"]
+    transport = _start_transport(cred)
+    try:
+        if cred.get("sftp_private_key"):
+            key = _load_private_key(cred["sftp_private_key"], cred.get("sftp_private_key_pass"))
+            transport.auth_publickey(login, key)
+        else:
+            use_agent = osh.emptystring(cred.get("sftp_passwd")) or _flag(cred, "sftp_use_agent")
+            if not (use_agent and _authenticate_agent(transport, login)):
+                if not transport.is_active():
+                    transport.close()
+                    transport = _start_transport(cred)
+                transport.auth_password(login, cred["sftp_passwd"])
+        transport.set_keepalive(_KEEPALIVE_INTERVAL)
+        return paramiko.SFTPClient.from_transport(transport)
+    except BaseException:
+        transport.close()
+        raise
+
+
+def _dropped_handshake(err: BaseException) -> bool:
+    """
+    Whether a handshake failure looks like the server dropping the connection early.
+
+    That is what servers throttling concurrent handshakes do (OpenSSH MaxStartups):
+    the peer closes or resets the socket, which paramiko reports as an EOF, a reset
+    or an unreadable protocol banner.
+    """
+    import paramiko  # lazy, see module imports
+    if isinstance(err, (EOFError, ConnectionResetError)):
+        return True
+    return type(err) is paramiko.SSHException and "protocol banner" in str(err)
+
+
+def _connect(cred: dict) -> paramiko.SFTPClient:
+    """
+    Open a brand new SFTP connection (full SSH handshake) from the credentials.
+
+    Handshakes dropped by the server (see `_dropped_handshake`) are retried with
+    exponential backoff and jitter. Any other failure (refused connection,
+    authentication, incompatible peer, closed session) is raised at once.
+    """
+    for attempt in range(_CONNECT_ATTEMPTS):
+        try:
+            return _open(cred)
+        except Exception as err:
+            if attempt == _CONNECT_ATTEMPTS - 1 or not _dropped_handshake(err):
+                raise
+            delay = 2 ** attempt + random.random()
+            logging.info(f"SFTP handshake with {cred['sftp_host']} failed ({str(err)}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _close_quietly(client: paramiko.SFTPClient):
+    """
+    Close a connection and its SSH transport, ignoring errors from an already broken transport.
+    """
+    try:
+        transport = client.get_channel().get_transport()
+        client.close()
+        transport.close()
+    except Exception as err:
+        logging.debug(f"Ignoring error while closing SFTP connection: {str(err)}")
+
+
+def _is_alive(client: paramiko.SFTPClient) -> bool:
+    """
+    Cheap liveness probe (one round-trip) for a pooled connection.
+    """
+    import paramiko  # lazy, see module imports
+    try:
+        if not client.get_channel().get_transport().is_active():
+            return False
+        client.normalize('.')
+        return True
+    except (paramiko.SSHException, EOFError, OSError):
+        return False
+
+
+def _connection_broken(client: paramiko.SFTPClient, err: BaseException) -> bool:
+    """
+    Whether a connection must be discarded after `err` was raised while using it.
+
+    True for transport failures (SSH errors, EOF, timeouts, resets, also when wrapped
+    by the helpers' own exceptions), for interruptions that may have left a reply
+    half read (KeyboardInterrupt, ...), and whenever the transport is no longer active.
+    """
+    import paramiko  # lazy, see module imports
+    if not isinstance(err, Exception):
+        return True
+    try:
+        if not client.get_channel().get_transport().is_active():
+            return True
+    except Exception:
+        return True
+    while err is not None:
+        if isinstance(err, (paramiko.SSHException, EOFError, TimeoutError, ConnectionError)):
+            return True
+        err = err.__cause__ or err.__context__
+    return False
+
+
+def _acquire(key: tuple[str, str, bool], cred: dict) -> paramiko.SFTPClient:
+    """
+    Take a live connection out of the pool, or open a new one if none is available.
+
+    Idle connections older than `_POOL_IDLE_TIMEOUT` are reaped on the way.
+    """
+    now = time.monotonic()
+    with _POOL_LOCK:
+        idle = _POOL.get(key, [])
+        expired = [client for client, released in idle if now - released > _POOL_IDLE_TIMEOUT]
+        idle = [(client, released) for client, released in idle if now - released <= _POOL_IDLE_TIMEOUT]
+        _POOL[key] = idle
+
+    for client in expired:
+        _close_quietly(client)
+
+    while True:
+        with _POOL_LOCK:
+            client = _POOL[key].pop()[0] if _POOL.get(key) else None
+        if client is None:
+            return _connect(cred)
+        if _is_alive(client):
+            return client
+        logging.info(f"Dropping dead pooled SFTP connection to {key[1]}@{key[0]}, reconnecting")
+        _close_quietly(client)
+
+
+def _release(key: tuple[str, str, bool], client: paramiko.SFTPClient):
+    """
+    Give a connection back to the pool for later reuse.
+
+    Its working directory is reset first, so a `chdir` made by one caller does not
+    change how relative paths resolve for the next ones.
+    """
+    client.chdir(None)  # local state only, no round-trip
+    with _POOL_LOCK:
+        idle = _POOL.setdefault(key, [])
+        idle.append((client, time.monotonic()))
+        surplus = [client for client, _ in idle[:-_POOL_MAX_IDLE]]
+        del idle[:-_POOL_MAX_IDLE]
+    for client in surplus:
+        _close_quietly(client)
+
+
+def close_all():
+    """
+    Close every pooled SFTP connection.
+
+    This is registered with `atexit`, but can be called explicitly
+    (e.g. before forking or when credentials change).
+    """
+    with _POOL_LOCK:
+        idle = [client for clients in _POOL.values() for client, _ in clients]
+        _POOL.clear()
+    for client in idle:
+        _close_quietly(client)
+
+
+atexit.register(close_all)
 
 
 @contextmanager
 def get_client_sftp(cred: dict):
     """
-    Establish an SFTP connection using the provided credentials.
+    Get an SFTP connection for the provided credentials.
+
+    Connections are pooled per (host, login, compression): leaving the 'with' block hands the
+    connection back to the pool instead of closing it, so consecutive calls skip
+    the SSH handshake. A pooled connection is checked for liveness before being
+    reused and transparently replaced if the server dropped it. If the body of
+    the 'with' block raises, the connection is still pooled for ordinary errors
+    (e.g. a missing remote file), and closed only when the failure comes from the
+    connection itself.
 
-    This function wraps the pysftp Connection using a context manager
-    to ensure the connection is safely closed after use.
+    Since version 2.0 the connection is a `paramiko.SFTPClient` (a `pysftp.Connection`
+    before), whose working directory is reset when it goes back to the pool.
 
     Parameters
     ----------
@@ -62,7 +519,7 @@ def get_client_sftp(cred: dict):
 
     Yields
     ------
-    pysftp.Connection
+    paramiko.SFTPClient
         The SFTP client connection for use within the 'with' context.
 
     Example
@@ -73,25 +530,32 @@ def get_client_sftp(cred: dict):
 
     Raises
     ------
-    SystemExit
+    Exception
         If the SFTP connection fails.
     """
-    cnopts = pysftp.CnOpts()
-    cnopts.hostkeys = None  # Disable host key checking for simplicity
-
+    key = (cred["sftp_host"], cred["sftp_login"], _compression(cred))
     try:
-        with pysftp.Connection(
-            cred["sftp_host"], username=cred["sftp_login"],
-            cnopts=cnopts, password=cred["sftp_passwd"]
-        ) as client:
-            yield client  # Yield the connection for use within a 'with' context
+        client = _acquire(key, cred)
     except Exception as err:
-        raise Exception(f"Failed to establish SFTP connection:\n{sftp://{cred['sftp_login']}@{cred['sftp_host']}}\nError: {str(err)}")
+        raise Exception(f"Failed to establish SFTP connection:\n\tsftp://{cred['sftp_login']}@{cred['sftp_host']}\nError: {str(err)}") from err
+
+    try:
+        yield client  # Yield the connection for use within a 'with' context
+    except BaseException as err:
+        if _connection_broken(client, err):
+            _close_quietly(client)
+        else:
+            _release(key, client)
+        raise
+    _release(key, client)
 
+@functools.lru_cache(maxsize=4096)
 def normalize_path(path: str) -> str:
     """
     Normalize a given path, ensuring it starts with a '/' and has no trailing slashes.
 
+    The root stays '/'. Results are cached, as the same paths recur across batch operations.
+
     Parameters
     ----------
     path : str
@@ -102,19 +566,23 @@ def normalize_path(path: str) -> str:
     str
         The normalized path.
     """
+    # Already normalized (the common case): returned as is, without building new strings
+    if path.startswith('/') and not path.endswith('/'):
+        return path
+
     # Ensure path starts with a single '/'
     if not path.startswith('/'):
         path = '/' + path
 
     # Remove any trailing slashes
-    return path.rstrip('/')
+    return path.rstrip('/') or '/'
 
 
 def strip_sftp_path(sftp_address: str, cred: dict) -> str:
     """
     Remove the SFTP protocol and host from an SFTP address.
 
-    This function strips the 'sftp://' prefix and the host from the full SFTP path, 
+    This function strips the leading 'sftp://' prefix and the host from the full SFTP path, 
     returning the relative path on the remote server.
 
     Parameters
@@ -134,10 +602,559 @@ def strip_sftp_path(sftp_address: str, cred: dict) -> str:
     >>> strip_sftp_path('sftp://example.com/folder/file.txt', cred)
     '/folder/file.txt'
     """
-    stripped_path = sftp_address.replace('sftp://', '').replace(cred["sftp_host"], '')
+    return _strip(sftp_address, cred["sftp_host"])
+
+
+@functools.lru_cache(maxsize=1024)
+def _strip(sftp_address: str, host: str) -> str:
+    """
+    Cached core of `strip_sftp_path`, keyed on hashable arguments (the credentials dict is not).
+    """
+    if sftp_address.startswith("sftp://"):
+        # Drop "sftp://[user@]host[:port]", up to the '/' starting the path
+        _, slash, path = sftp_address[len("sftp://"):].partition('/')
+        stripped_path = slash + path
+    else:
+        stripped_path = sftp_address.removeprefix(host)  # "host/path" without the protocol
     return normalize_path(stripped_path)
 
 
+def _stat(sftp: paramiko.SFTPClient, remote_path: str) -> paramiko.SFTPAttributes:
+    """
+    Attributes of `remote_path` (one round-trip), or None if it does not exist.
+
+    Only a missing path maps to None; other errors (permissions, broken connection)
+    are raised instead of being mistaken for absence.
+    """
+    try:
+        return sftp.stat(remote_path)
+    except FileNotFoundError:
+        return None
+
+
+def _exists(sftp: paramiko.SFTPClient, remote_path: str) -> bool:
+    """
+    Check whether `remote_path` exists, on an already open connection.
+    """
+    return _stat(sftp, remote_path) is not None
+
+
+def _dir_exists(sftp: paramiko.SFTPClient, remote_dir: str) -> bool:
+    """
+    Check whether `remote_dir` is an existing directory, on an already open connection.
+    """
+    # stat is side-effect free, unlike cwd which changes the session state
+    attrs = _stat(sftp, remote_dir)
+    return attrs is not None and stat.S_ISDIR(attrs.st_mode)
+
+
+def _delete(sftp: paramiko.SFTPClient, remote_path: str) -> bool:
+    """
+    Delete `remote_path` on an already open connection, doing nothing if it does not exist.
+
+    A single round-trip: the `remove` itself tells whether the file was missing.
+    """
+    try:
+        sftp.remove(remote_path)  # raises on failure, no need to stat again
+    except FileNotFoundError:
+        logging.info(f"SFTP remote file {remote_path} does not exist, skipping deletion.")
+    return True
+
+
+class _Responses:
+    """
+    Collector of pipelined SFTP replies, keyed by request number.
+
+    Passed as the `fileobj` of paramiko's asynchronous requests: the client hands it
+    every reply it reads, the same hook `SFTPFile.prefetch` relies on.
+    """
+
+    def __init__(self):
+        self.received = {}
+
+    def _async_response(self, t, msg, num):
+        self.received[num] = (t, msg)
+
+
+def _pipelined(sftp: paramiko.SFTPClient, command: int, remote_paths: list[str], window: int = _MAX_CONCURRENT_REQUESTS) -> list:
+    """
+    Send the SFTP `command` for every path without waiting for each reply.
+
+    Up to `window` requests are in flight at once on the one channel, so N small
+    operations cost about N / window round-trips instead of N. Returns the raw
+    (type, message) replies in the order of `remote_paths`.
+    """
+    responses = _Responses()
+    numbers = []
+    for remote_path in remote_paths:
+        while len(numbers) - len(responses.received) >= window:
+            sftp._read_response()
+        numbers.append(sftp._async_request(responses, command, sftp._adjust_cwd(remote_path)))
+    while len(responses.received) < len(numbers):
+        sftp._read_response()
+    return [responses.received.pop(num) for num in numbers]
+
+
+def _stat_many(sftp: paramiko.SFTPClient, remote_paths: list[str]) -> list:
+    """
+    Pipelined `_stat` of many paths: their attributes, or None for the missing ones.
+    """
+    import paramiko  # lazy, see module imports
+    from paramiko.sftp import CMD_ATTRS, CMD_STAT, CMD_STATUS
+
+    attrs = []
+    for t, msg in _pipelined(sftp, CMD_STAT, remote_paths):
+        if t == CMD_ATTRS:
+            attrs.append(paramiko.SFTPAttributes._from_msg(msg))
+            continue
+        if t == CMD_STATUS:
+            try:
+                sftp._convert_status(msg)
+            except FileNotFoundError:
+                attrs.append(None)
+                continue
+        raise paramiko.SFTPError("Expected attributes")
+    return attrs
+
+
+def _delete_many(sftp: paramiko.SFTPClient, remote_paths: list[str]):
+    """
+    Pipelined `_delete` of many paths, doing nothing for the missing ones.
+    """
+    from paramiko.sftp import CMD_REMOVE
+
+    for remote_path, (_, msg) in zip(remote_paths, _pipelined(sftp, CMD_REMOVE, remote_paths)):
+        try:
+            sftp._convert_status(msg)
+        except FileNotFoundError:
+            logging.info(f"SFTP remote file {remote_path} does not exist, skipping deletion.")
+
+
+def _make_dirs(sftp: paramiko.SFTPClient, remote_dir: str):
+    """
+    Create `remote_dir` and its missing parents on an already open connection, like `os.makedirs`.
+
+    The `mkdir` is issued optimistically, starting from the deepest level: when the
+    parent exists this is a single round-trip, and the existing levels above are
+    never probed. Only a missing parent makes it climb one level up, then the
+    `mkdir` is retried once the parents exist.
+    """
+    for retry in (False, True):
+        try:
+            sftp.mkdir(remote_dir)
+            return
+        except FileNotFoundError:
+            parent = str(PurePosixPath(remote_dir).parent)
+            if retry or parent == remote_dir:
+                raise
+            _make_dirs(sftp, parent)
+        except IOError:
+            # Generic failure, most often an already existing path (possibly created
+            # meanwhile by another client): only an error if it is not a directory
+            if not _dir_exists(sftp, remote_dir):
+                raise
+            return
+
+
+def _advise_sequential(local_file):
+    """
+    Tell the kernel `local_file` is read or written front to back, so it reads ahead more (no-op where unsupported).
+    """
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(local_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+
+def _copy_into(src_file, dst_file, block_size: int):
+    """
+    Copy `src_file` to `dst_file` through one reused buffer, without a new bytes object per block.
+    """
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    while True:
+        n = src_file.readinto(buffer)
+        if not n:
+            break
+        dst_file.write(view[:n])
+
+
+def _upload(sftp: paramiko.SFTPClient, local_path: str, remote_path: str, block_size: int = _BLOCK_SIZE, delete_first: bool = False):
+    """
+    Replace `remote_path` by `local_path` on an already open connection, keeping its modification time.
+
+    The file is sent in `block_size` write requests. Opening it for writing truncates
+    any previous remote file; `delete_first` removes it beforehand instead, for
+    servers without truncate semantics.
+    """
+    if delete_first:
+        _delete(sftp, remote_path)
+    local_stat = os.stat(local_path)
+    # Both ends unbuffered: blocks are read straight into the copy buffer and
+    # go straight out as write requests
+    with open(local_path, 'rb', buffering=0) as fl, sftp.open(remote_path, 'wb', bufsize=0) as remote_file:
+        _advise_sequential(fl)
+        remote_file.MAX_REQUEST_SIZE = block_size
+        # Pipelined writes do not wait for each ACK, over the large channel window
+        remote_file.set_pipelined(True)
+        _copy_into(fl, remote_file, block_size)
+    # Server-side stat of the result, as the confirm option of put does
+    remote_size = sftp.stat(remote_path).st_size
+    if remote_size != local_stat.st_size:
+        raise IOError(f"size mismatch in put! {remote_size} != {local_stat.st_size}")
+    sftp.utime(remote_path, (local_stat.st_atime, local_stat.st_mtime))
+
+
+def _already_uploaded(sftp: paramiko.SFTPClient, local_path: str, remote_path: str) -> bool:
+    """
+    Whether `remote_path` already holds a file of the same size as `local_path`.
+
+    Only meaningful for remote paths named after the content hash, where a file of the
+    same name and size is taken to be the same file, even from an earlier run.
+    """
+    attrs = _stat(sftp, remote_path)
+    return attrs is not None and attrs.st_size == os.path.getsize(local_path)
+
+
+def _download(sftp: paramiko.SFTPClient, remote_path: str, local_path: str):
+    """
+    Copy `remote_path` to `local_path` on an already open connection, keeping its modification time.
+
+    The file is fetched in `_READ_BLOCK_SIZE` read requests, which every server answers in full.
+    """
+    remote_stat = sftp.stat(remote_path)
+    # Blocks larger than the local write buffer are passed straight to the file, without another copy
+    with sftp.open(remote_path, 'rb') as remote_file, open(local_path, 'wb') as local_file:
+        _advise_sequential(local_file)
+        remote_file.MAX_REQUEST_SIZE = _READ_BLOCK_SIZE
+        # Issue the read requests ahead of consumption so many are in flight at once,
+        # instead of one request per round-trip
+        remote_file.prefetch(remote_stat.st_size, _MAX_CONCURRENT_REQUESTS)
+        shutil.copyfileobj(remote_file, local_file, remote_file.MAX_REQUEST_SIZE)
+    os.utime(local_path, (remote_stat.st_atime, remote_stat.st_mtime))
+    osh.checkfile(local_path, msg=f"Download failed for {remote_path}")
+
+
+def _content_hash(local_path: str) -> str:
+    """
+    Hash of the content of `local_path`, used to name uploads without destination.
+
+    With the optional blake3 package, the file is memory-mapped and hashed with SIMD
+    BLAKE3 kernels (several GB/s); otherwise `osh.hashfile` is used. Both hash the
+    content only, so with either one the same file always gets the same name (the
+    digests differ, so installing blake3 renames later uploads once). The hash is
+    cached on (path, mtime, size), so retries and repeated uploads of an unchanged
+    file do not read it again.
+    """
+    local_stat = os.stat(local_path)
+    return _cached_content_hash(os.path.abspath(local_path), local_stat.st_mtime_ns, local_stat.st_size)
+
+
+@functools.lru_cache(maxsize=1024)
+def _cached_content_hash(local_path: str, mtime_ns: int, size: int) -> str:
+    """
+    Cached core of `_content_hash`; the modification time and size only key the cache.
+    """
+    if blake3 is None:
+        # Content only (no date): the same file always gets the same remote name
+        return osh.hashfile(local_path, hash_content=True, date=False)
+
+    with open(local_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return blake3.blake3(b"").hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return blake3.blake3(m, max_threads=blake3.blake3.AUTO).hexdigest()
+
+
+def _default_sftp_address(local_path: str, cred: dict) -> str:
+    """
+    Content-based remote address used when no destination is given for `local_path`.
+
+    Only called when the destination is empty, so explicit uploads never hash the file.
+    """
+    _, _, ext = osh.folder_name_ext(local_path)
+    h = _content_hash(local_path)
+    return f"{cred['sftp_destination_path']}/{h}.{ext}"
+
+
+def _archive_compression(remote_path: str) -> str:
+    """
+    Compression of a tar archive from its remote name: 'zst', 'gz' or '' (plain tar).
+    """
+    name = remote_path.lower()
+    if name.endswith(('.tar.zst', '.tzst')):
+        return 'zst'
+    if name.endswith(('.tar.gz', '.tgz')):
+        return 'gz'
+    if name.endswith('.tar'):
+        return ''
+    raise ValueError(f"Unsupported archive name {remote_path} (expected .tar, .tar.gz/.tgz or .tar.zst/.tzst)")
+
+
+def _write_archive(remote_file, local_paths: list[str], compression: str):
+    """
+    Stream a tar archive of `local_paths` into the open `remote_file`, compressing on the fly.
+    """
+    if compression == 'zst':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd archives require zstandard:\n\tpip install zstandard")
+        cctx = zstandard.ZstdCompressor(level=3, threads=-1)
+        with cctx.stream_writer(remote_file, closefd=False) as compressed:
+            with tarfile.open(fileobj=compressed, mode='w|') as tar:
+                for local_path in local_paths:
+                    tar.add(local_path)
+    else:
+        with tarfile.open(fileobj=remote_file, mode=f'w|{compression}') as tar:
+            for local_path in local_paths:
+                tar.add(local_path)
+
+
+def _exec(transport: paramiko.Transport, command: str):
+    """
+    Run a shell command on the server through an SSH exec channel.
+    """
+    channel = transport.open_session()
+    try:
+        channel.exec_command(command)
+        status = channel.recv_exit_status()
+        if status != 0:
+            error = channel.makefile_stderr('rb').read().decode(errors='replace')
+            raise Exception(f"Remote command failed ({status}):\n\t{command}\n{error}")
+    finally:
+        channel.close()
+
+
+def _fan_out(cred: dict, task, items: list, max_workers: int = None) -> list:
+    """
+    Run `task(sftp, item)` for every item, spread over several SFTP channels of one SSH connection.
+
+    The handshake is paid once; each worker thread then opens its own SFTP channel
+    on the shared transport, so up to `max_workers` (default: the optional
+    `sftp_parallel` credential, else 8; capped at `_MAX_CHANNELS`) operations are
+    in flight at the same time. Progress is logged as operations complete; results
+    keep the order of `items` and the first failure is raised once all workers are done.
+    """
+    import paramiko  # lazy, see module imports
+    items = list(items)
+    if len(items) == 0:
+        return []
+
+    if max_workers is None:
+        max_workers = int(cred.get("sftp_parallel", _MAX_CHANNELS))
+    workers = max(1, min(max_workers, _MAX_CHANNELS, len(items)))
+    local = threading.local()
+    channels = []
+    channels_lock = threading.Lock()
+
+    with get_client_sftp(cred) as sftp:
+        transport = sftp.get_channel().get_transport()
+
+        def run(item):
+            channel = getattr(local, "sftp", None)
+            if channel is None:
+                channel = paramiko.SFTPClient.from_transport(transport)
+                local.sftp = channel
+                with channels_lock:
+                    channels.append(channel)
+            return task(channel, item)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run, item) for item in items]
+                for done, _ in enumerate(as_completed(futures), 1):
+                    logging.info(f"SFTP batch progress: {done}/{len(futures)}")
+            return [future.result() for future in futures]
+        finally:
+            for channel in channels:
+                channel.close()
+
+
+class Session:
+    """
+    Connection-scoped access to the SFTP server.
+
+    All operations of a session run on the same SFTP connection, taken from the pool
+    when entering the 'with' block and handed back when leaving it, so N operations
+    cost a single handshake. The module-level functions are thin wrappers opening a
+    session for one operation.
+
+    Parameters
+    ----------
+    cred : dict
+        SFTP credentials dictionary.
+    sftp : paramiko.SFTPClient, optional
+        An already open connection to use instead of a pooled one; the session then
+        does not need to be entered and never closes it.
+
+    Example
+    -------
+    >>> with Session(cred) as s:
+    ...     for f in ['a.txt', 'b.txt']:
+    ...         s.upload(f, f'sftp://example.com/folder/{f}')
+    """
+
+    def __init__(self, cred: dict, sftp: paramiko.SFTPClient = None):
+        self._cred = cred
+        self._sftp = sftp
+        self._context = None
+
+    def __enter__(self):
+        if self._sftp is None:
+            self._context = get_client_sftp(self._cred)
+            self._sftp = self._context.__enter__()
+        return self
+
+    def __exit__(self, etype, value, traceback):
+        if self._context is not None:
+            context, self._context, self._sftp = self._context, None, None
+            return context.__exit__(etype, value, traceback)
+
+    def _block_size(self) -> int:
+        """
+        Size of the SFTP write requests, from the optional `sftp_block_size` credential.
+        """
+        return int(self._cred.get("sftp_block_size", _BLOCK_SIZE))
+
+    def exists(self, sftp_address: str) -> bool:
+        """
+        Check if a remote file exists, like `remote_file_exists`.
+        """
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+        try:
+            exists = _exists(self._sftp, remote_path)
+        except Exception as err:
+            raise Exception(f"Failed to check SFTP file existence for {sftp_address}.\nError: {str(err)}")
+        logging.info(f"SFTP file {sftp_address} existence check: {'True' if exists else 'False'}")
+        return exists
+
+    def exists_many(self, sftp_addresses: list[str]) -> dict[str, bool]:
+        """
+        Check many remote files with pipelined requests, like `remote_files_exist`.
+        """
+        remote_paths = [strip_sftp_path(sftp_address, self._cred) for sftp_address in sftp_addresses]
+        try:
+            attrs = _stat_many(self._sftp, remote_paths)
+        except Exception as err:
+            raise Exception(f"Failed to check SFTP files existence.\nError: {str(err)}")
+        exists = {sftp_address: a is not None for sftp_address, a in zip(sftp_addresses, attrs)}
+        logging.info(f"SFTP files existence check: {sum(exists.values())}/{len(exists)} found")
+        return exists
+
+    def files_exist_in(self, remote_dir: str, names: list[str]) -> dict[str, bool]:
+        """
+        Check many file names of one remote directory, like `remote_files_exist_in`.
+        """
+        remote_dir = strip_sftp_path(remote_dir, self._cred)
+        try:
+            present = {attrs.filename for attrs in self._sftp.listdir_attr(remote_dir)}
+        except FileNotFoundError:
+            present = set()
+        except Exception as err:
+            raise Exception(f"Failed to list SFTP directory {remote_dir}.\nError: {str(err)}")
+        return {name: name in present for name in names}
+
+    def dir_exists(self, ftp_dir: str) -> bool:
+        """
+        Check if a remote directory exists, like `remote_dir_exist`.
+        """
+        return _dir_exists(self._sftp, normalize_path(ftp_dir))
+
+    def make_directory(self, ftp_directory: str):
+        """
+        Ensure a remote directory exists, like `make_remote_directory`.
+        """
+        sftp = self._sftp
+        remote_dir = normalize_path(ftp_directory)
+        if _dir_exists(sftp, remote_dir):
+            logging.info(f"Directory already exists: {ftp_directory}")
+            return
+
+        _make_dirs(sftp, remote_dir)
+
+    def delete(self, sftp_address: str) -> bool:
+        """
+        Delete a remote file, like `delete`.
+        """
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+        try:
+            _delete(self._sftp, remote_path)
+        except Exception as err:
+            raise Exception(f"Failed to delete SFTP file:\n\t{sftp_address}.\nError:\n\t{str(err)}")
+        logging.info(f"SFTP file {sftp_address} successfully deleted.")
+        return True
+
+    def delete_many(self, sftp_addresses: list[str]) -> dict[str, bool]:
+        """
+        Delete many remote files with pipelined requests, like `delete_many`.
+        """
+        remote_paths = [strip_sftp_path(sftp_address, self._cred) for sftp_address in sftp_addresses]
+        try:
+            _delete_many(self._sftp, remote_paths)
+        except Exception as err:
+            raise Exception(f"Failed to delete SFTP files:\n\t{sftp_addresses}.\nError:\n\t{str(err)}")
+        logging.info(f"SFTP files successfully deleted: {len(sftp_addresses)}")
+        return {sftp_address: True for sftp_address in sftp_addresses}
+
+    def upload(self, local_path: str, sftp_address: str = "") -> str:
+        """
+        Upload a local file, like `upload`.
+        """
+        content_addressed = osh.emptystring(sftp_address)
+        if content_addressed:
+            sftp_address = _default_sftp_address(local_path, self._cred)
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+
+        try:
+            if content_addressed and _already_uploaded(self._sftp, local_path, remote_path):
+                logging.info(f"Already uploaded: {local_path} -> {sftp_address}")
+                return sftp_address
+            _upload(self._sftp, local_path, remote_path, self._block_size(), _flag(self._cred, "sftp_delete_before_put"))
+        except Exception as err:
+            raise Exception(f"Upload failed:\n\t{local_path}\n\t->{sftp_address}.\nError:\n\t{str(err)}")
+        logging.info(f"Upload successful: {local_path} -> {sftp_address}")
+        return sftp_address
+
+    def download(self, sftp_address: str, local_path: str = "") -> str:
+        """
+        Download a remote file, like `download`.
+        """
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+        if osh.emptystring(local_path):
+            local_path = remote_path.split('/')[-1]
+
+        try:
+            _download(self._sftp, remote_path, local_path)
+        except Exception as err:
+            raise Exception(f"Download failed:\n\t{sftp_address}\n\t->{local_path}.\nError:\n\t{str(err)}")
+        logging.info(f"Download successful: {sftp_address} -> {local_path}")
+        return local_path
+
+    def upload_archive(self, local_paths: list[str], sftp_address: str, extract: bool = False) -> str:
+        """
+        Upload many local files as one compressed tar archive, like `upload_archive`.
+        """
+        remote_path = strip_sftp_path(sftp_address, self._cred)
+        try:
+            compression = _archive_compression(remote_path)
+            block_size = self._block_size()
+            # Buffered: tar writes small records, sent as `block_size` requests
+            with self._sftp.open(remote_path, 'wb', bufsize=block_size) as remote_file:
+                remote_file.MAX_REQUEST_SIZE = block_size
+                remote_file.set_pipelined(True)
+                _write_archive(remote_file, local_paths, compression)
+            logging.info(f"Archive upload successful: {len(local_paths)} paths -> {sftp_address}")
+
+            if extract:
+                remote_dir = str(PurePosixPath(remote_path).parent)
+                archive = shlex.quote(remote_path)
+                untar = f"zstd -dc {archive} | tar -xf -" if compression == 'zst' else f"tar -x{'z' if compression == 'gz' else ''}f {archive}"
+                _exec(self._sftp.get_channel().get_transport(), f"cd {shlex.quote(remote_dir)} && {untar} && rm -f {archive}")
+                logging.info(f"Archive extracted in {remote_dir}")
+        except Exception as err:
+            raise Exception(f"Archive upload failed:\n\t{local_paths}\n\t->{sftp_address}.\nError:\n\t{str(err)}")
+        return sftp_address
+
+
 def remote_file_exists(sftp_address: str, cred: dict) -> bool:
     """
     Check if a remote file exists on the SFTP server.
@@ -159,15 +1176,38 @@ def remote_file_exists(sftp_address: str, cred: dict) -> bool:
     >>> remote_file_exists('sftp://example.com/folder/file.txt', cred)
     True
     """
-    remote_path = strip_sftp_path(sftp_address, cred)
-    try:
-        with get_client_sftp(cred) as sftp:
-            exists = sftp.exists(remote_path)
-            logging.info(f"SFTP file {sftp_address} existence check: {'True' if exists else 'False'}")
-            return exists
-    except Exception as err:
-        raise Exception(f"Failed to check SFTP file existence for {sftp_address}.\nError: {str(err)}")
-    return False
+    with Session(cred) as s:
+        return s.exists(sftp_address)
+
+
+def remote_files_exist_in(remote_dir: str, names: list[str], cred: dict) -> dict[str, bool]:
+    """
+    Check if files exist in one remote directory, with a single directory listing.
+
+    Listing the directory once replaces one `stat` round-trip per name,
+    which suits sync or upload-if-missing workflows.
+
+    Parameters
+    ----------
+    remote_dir : str
+        The remote directory (path or full SFTP address).
+    names : list[str]
+        File names (without directory) to look for.
+    cred : dict
+        SFTP credentials dictionary.
+
+    Returns
+    -------
+    dict[str, bool]
+        Existence of each name; all False if the directory does not exist.
+
+    Example
+    -------
+    >>> remote_files_exist_in('sftp://example.com/folder', ['a.txt', 'b.txt'], cred)
+    {'a.txt': True, 'b.txt': False}
+    """
+    with Session(cred) as s:
+        return s.files_exist_in(remote_dir, names)
 
 
 def remote_dir_exist(ftp_dir: str, cred: dict) -> bool:
@@ -186,17 +1226,18 @@ def remote_dir_exist(ftp_dir: str, cred: dict) -> bool:
     bool
         True if the directory exists, False otherwise.
     """
-    with get_client_sftp(cred) as sftp:
-        try:
-            sftp.cwd(ftp_dir)  # Try to change to the directory
-            return True
-        except IOError:
-            return False
+    with Session(cred) as s:
+        return s.dir_exists(ftp_dir)
 
 def make_remote_directory(ftp_directory: str, cred: dict):
     """
     Ensure the specified remote directory exists, creating it if necessary.
 
+    All checks and creations happen on a single SFTP connection. The directory is
+    created optimistically from the deepest level up, so a missing leaf under an
+    existing parent costs two round-trips whatever the depth; a failing `mkdir`
+    raises, so no final re-check is needed.
+
     Parameters
     ----------
     ftp_directory : str
@@ -204,21 +1245,8 @@ def make_remote_directory(ftp_directory: str, cred: dict):
     cred : dict
         Dictionary containing SFTP credentials.
     """
-    if not remote_dir_exist(ftp_directory, cred):
-        ftp_directories = [f for f in ftp_directory.split("/") if f]  # Split and clean up path
-        with get_client_sftp(cred) as sftp:
-            # Create each directory level if it does not exist
-            for i in range(len(ftp_directories)):
-                current_path = "/" + "/".join(ftp_directories[:i + 1])
-                try:
-                    sftp.cwd(current_path)  # Check if directory exists
-                except IOError:
-                    sftp.mkdir(current_path)  # Create directory if it doesn’t exist
-
-        # Final verification step
-        assert remote_dir_exist(ftp_directory, cred), f"Remote directory creation failed:\n\t{ftp_directory}\n\t(stopped at {current_path})"
-    else:
-        logging.info(f"Directory already exists: {ftp_directory}")
+    with Session(cred) as s:
+        s.make_directory(ftp_directory)
 
 
 def delete(sftp_address: str, cred: dict) -> bool:
@@ -242,28 +1270,19 @@ def delete(sftp_address: str, cred: dict) -> bool:
     >>> delete('sftp://example.com/folder/file.txt', cred)
     True
     """
-    remote_path = strip_sftp_path(sftp_address, cred)
-    
-    if not(remote_file_exists(remote_path, cred)):
-        logging.info(f"SFTP remote file {remote_path} does not exist, skipping deletion.")
-        return True
-
-    try:
-        with get_client_sftp(cred) as sftp:
-            sftp.remove(remote_path)
-            assert not remote_file_exists(sftp_address, cred), f"Failed to delete {sftp_address} on SFTP server."
-            logging.info(f"SFTP file {sftp_address} successfully deleted.")
-            return True
-    except Exception as err:
-        raise Exception(f"Failed to delete SFTP file:\n\t{sftp_address}.\nError:\n\t{str(err)}")
-    return False
+    with Session(cred) as s:
+        return s.delete(sftp_address)
 
 
 def upload(local_path: str, cred: dict, sftp_address: str = "") -> str:
     """
     Upload a local file to the remote SFTP server.
 
-    If no destination path is provided, a random filename based on the file's hash will be used.
+    If no destination path is provided, the file is named after the hash of its content;
+    the transfer is then skipped when a file with that name and size is already on the server.
+    Any previous remote file is truncated (or first removed when the `sftp_delete_before_put`
+    credential is set) and the file is sent in pipelined requests of `sftp_block_size`
+    bytes (its size is checked by a server-side stat), all on a single SFTP connection.
 
     Parameters
     ----------
@@ -272,7 +1291,7 @@ def upload(local_path: str, cred: dict, sftp_address: str = "") -> str:
     cred : dict
         SFTP credentials dictionary.
     sftp_address : str, optional
-        Remote SFTP destination path. If not provided, a random path is generated.
+        Remote SFTP destination path. If not provided, a content hash-based path is generated.
 
     Returns
     -------
@@ -284,22 +1303,8 @@ def upload(local_path: str, cred: dict, sftp_address: str = "") -> str:
     >>> upload('local_file.txt', cred, 'sftp://example.com/folder/file.txt')
     'sftp://example.com/folder/file.txt'
     """
-    if osh.emptystring(sftp_address):
-        _, _, ext = osh.folder_name_ext(local_path)
-        h = osh.hashfile(local_path, hash_content=True, date=True)
-        sftp_address = f"{cred['sftp_destination_path']}/{h}.{ext}"
-
-    delete(sftp_address, cred)
-
-    remote_path = strip_sftp_path(sftp_address, cred)
-    try:
-        with get_client_sftp(cred) as sftp:
-            sftp.put(local_path, remote_path, preserve_mtime=True, confirm=True)
-            assert remote_file_exists(sftp_address, cred), f"Upload failed for {sftp_address}"
-            logging.info(f"Upload successful: {local_path} -> {sftp_address}")
-            return sftp_address
-    except Exception as err:
-        raise Exception(f"Upload failed:\n\t{local_path}\n\t->{sftp_address}.\nError:\n\t{str(err)}")
+    with Session(cred) as s:
+        return s.upload(local_path, sftp_address)
 
 
 def download(sftp_address: str, cred: dict, local_path: str = "") -> str:
@@ -310,16 +1315,166 @@ def download(sftp_address: str, cred: dict, local_path: str = "") -> str:
 
     Parameters
     ----------
-    sftp_address : str"""
-    remote_path = strip_sftp_path(sftp_address, cred)
-    if osh.emptystring(local_path):
-        local_path = remote_path.split('/')[-1]
+    sftp_address : str
+        The full SFTP path to the remote file.
+    cred : dict
+        SFTP credentials dictionary.
+    local_path : str, optional
+        Local destination path. If not provided, the remote basename is used.
 
-    try:
-        with get_client_sftp(cred) as sftp:
-            sftp.get(remote_path, local_path, preserve_mtime=True)
-            osh.checkfile(local_path, msg=f"Download failed for {sftp_address}")
-            logging.info(f"Download successful: {sftp_address} -> {local_path}")
-            return local_path
-    except Exception as err:
-        raise Exception(f"Download failed:\n\t{sftp_address}\n\t->{local_path}.\nError:\n\t{str(err)}")
+    Returns
+    -------
+    str
+        The local path if download is successful.
+
+    Example
+    -------
+    >>> download('sftp://example.com/folder/file.txt', cred, 'local_copy.txt')
+    'local_copy.txt'
+    """
+    with Session(cred) as s:
+        return s.download(sftp_address, local_path)
+
+
+def upload_archive(local_paths: list[str], cred: dict, sftp_address: str, extract: bool = False) -> str:
+    """
+    Upload many local files as a single tar archive, compressed on the fly.
+
+    Many small files cost one SFTP round-trip sequence each; packing them into one
+    stream sends them in a single transfer. The archive is written straight to the
+    server, without a local temporary file. The compression follows the archive
+    name: '.tar.zst'/'.tzst' (zstd, needs the optional zstandard package),
+    '.tar.gz'/'.tgz' (gzip) or '.tar' (none).
+
+    Parameters
+    ----------
+    local_paths : list[str]
+        Local files or folders to pack, stored in the archive under these (relative) paths.
+    cred : dict
+        SFTP credentials dictionary.
+    sftp_address : str
+        Remote SFTP path of the archive.
+    extract : bool, optional
+        Unpack the archive next to itself through an SSH exec channel, then remove it.
+        Requires shell access (and `zstd` for zstd archives) on the server.
+
+    Returns
+    -------
+    str
+        The remote path of the archive if upload is successful.
+
+    Example
+    -------
+    >>> upload_archive(['a.txt', 'b.txt'], cred, 'sftp://example.com/folder/files.tar.zst', extract=True)
+    'sftp://example.com/folder/files.tar.zst'
+    """
+    with Session(cred) as s:
+        return s.upload_archive(local_paths, sftp_address, extract)
+
+
+def remote_files_exist(sftp_addresses: list[str], cred: dict) -> dict[str, bool]:
+    """
+    Check the existence of many remote files over one SFTP connection.
+
+    All the `stat` requests are pipelined on a single SFTP channel (up to 64 in
+    flight), so N checks cost about N / 64 round-trips instead of N.
+
+    Parameters
+    ----------
+    sftp_addresses : list[str]
+        The full SFTP paths to check.
+    cred : dict
+        SFTP credentials dictionary.
+
+    Returns
+    -------
+    dict[str, bool]
+        Existence of each address.
+
+    Example
+    -------
+    >>> remote_files_exist(['sftp://example.com/a.txt', 'sftp://example.com/b.txt'], cred)
+    {'sftp://example.com/a.txt': True, 'sftp://example.com/b.txt': False}
+    """
+    with Session(cred) as s:
+        return s.exists_many(sftp_addresses)
+
+
+def delete_many(sftp_addresses: list[str], cred: dict) -> dict[str, bool]:
+    """
+    Delete many files from the remote SFTP server over one SFTP connection.
+
+    All the `remove` requests are pipelined on a single SFTP channel, as in `remote_files_exist`.
+
+    Parameters
+    ----------
+    sftp_addresses : list[str]
+        The full SFTP paths to delete.
+    cred : dict
+        SFTP credentials dictionary.
+
+    Returns
+    -------
+    dict[str, bool]
+        True for each address that was deleted or didn't exist.
+    """
+    with Session(cred) as s:
+        return s.delete_many(sftp_addresses)
+
+
+def upload_many(pairs: list[tuple[str, str]], cred: dict, max_workers: int = None) -> list[str]:
+    """
+    Upload many local files to the remote SFTP server over one SFTP connection.
+
+    Parameters
+    ----------
+    pairs : list[tuple[str, str]]
+        (local_path, sftp_address) pairs. An empty address gets a hash-based name and
+        skips files already on the server, as in `upload`.
+    cred : dict
+        SFTP credentials dictionary.
+    max_workers : int, optional
+        Number of parallel SFTP channels (at most 8), by default the `sftp_parallel`
+        credential if set, else 8.
+
+    Returns
+    -------
+    list[str]
+        The remote address of each uploaded file, in the order of `pairs`.
+
+    Example
+    -------
+    >>> upload_many([('a.txt', 'sftp://example.com/folder/a.txt'), ('b.txt', 'sftp://example.com/folder/b.txt')], cred)
+    ['sftp://example.com/folder/a.txt', 'sftp://example.com/folder/b.txt']
+    """
+    def task(sftp, pair):
+        local_path, sftp_address = pair
+        return Session(cred, sftp).upload(local_path, sftp_address)
+
+    return _fan_out(cred, task, pairs, max_workers)
+
+
+def download_many(pairs: list[tuple[str, str]], cred: dict, max_workers: int = None) -> list[str]:
+    """
+    Download many files from the remote SFTP server over one SFTP connection.
+
+    Parameters
+    ----------
+    pairs : list[tuple[str, str]]
+        (sftp_address, local_path) pairs. An empty local path means the remote basename, as in `download`.
+    cred : dict
+        SFTP credentials dictionary.
+    max_workers : int, optional
+        Number of parallel SFTP channels (at most 8), by default the `sftp_parallel`
+        credential if set, else 8.
+
+    Returns
+    -------
+    list[str]
+        The local path of each downloaded file, in the order of `pairs`.
+    """
+    def task(sftp, pair):
+        sftp_address, local_path = pair
+        return Session(cred, sftp).download(sftp_address, local_path)
+
+    return _fan_out(cred, task, pairs, max_workers)
@@ -0,0 +1,862 @@
+"""
+Tests for sftp_helper.
+
+The SSH layer is replaced by an in-memory SFTP client (`FakeSFTP`) patched in place of
+`main._open`, so the tests need no server and count the handshakes actually performed.
+"""
+
+import asyncio
+import io
+import os
+import socket
+import threading
+import time
+
+import paramiko
+import pytest
+from paramiko.message import Message
+from paramiko.sftp import CMD_ATTRS, CMD_STAT, CMD_STATUS, SFTP_NO_SUCH_FILE, SFTP_OK
+
+import sftp_helper as sftph
+from sftp_helper import async_main, main
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+    def close(self):
+        self.active = False
+
+
+class FakeChannel:
+    def __init__(self, transport):
+        self._transport = transport
+
+    def get_transport(self):
+        return self._transport
+
+
+class FakeRemoteFile(io.BytesIO):
+    MAX_REQUEST_SIZE = 32768
+
+    def __init__(self, files, path):
+        super().__init__()
+        self._files = files
+        self._path = path
+
+    def set_pipelined(self, pipelined=True):
+        pass
+
+    def close(self):
+        if not self.closed:
+            self._files[self._path] = self.getvalue()
+        super().close()
+
+
+class FakeReadFile(io.BytesIO):
+    """
+    Remote file of a server capping each READ reply at `cap` bytes, as sftp-server before OpenSSH 8.6.
+
+    Paramiko stops prefetching after a short reply, so `short_replies` counts the
+    prefetched requests larger than the cap.
+    """
+    MAX_REQUEST_SIZE = 32768
+
+    def __init__(self, data, cap):
+        super().__init__(data)
+        self._cap = cap
+        self.prefetched = 0
+        self.short_replies = 0
+
+    def prefetch(self, file_size=None, max_concurrent_requests=None):
+        requests = range(0, file_size, self.MAX_REQUEST_SIZE)
+        self.prefetched = len(requests)
+        if self.MAX_REQUEST_SIZE > self._cap:
+            self.short_replies = len(requests)
+
+    def read(self, size=-1):
+        return super().read(min(size, self._cap) if size >= 0 else size)
+
+
+class FakeSFTP:
+    """
+    In-memory stand-in for paramiko.SFTPClient, covering what the helpers call.
+    """
+
+    read_cap = 64 << 10
+
+    def __init__(self, files, dirs=None):
+        self.files = files
+        self.dirs = {"/"} if dirs is None else dirs
+        self.transport = FakeTransport()
+        self.closed = False
+        self.cwd = None
+        self.read_files = []
+
+    def get_channel(self):
+        return FakeChannel(self.transport)
+
+    def close(self):
+        self.closed = True
+
+    def normalize(self, path):
+        if not self.transport.active:
+            raise EOFError("connection dropped")
+        return "/"
+
+    def stat(self, path):
+        attrs = paramiko.SFTPAttributes()
+        if path in self.dirs:
+            attrs.st_mode = 0o040755
+            return attrs
+        if path not in self.files:
+            raise FileNotFoundError(2, "No such file")
+        attrs.st_size = len(self.files[path])
+        attrs.st_mode = 0o100644
+        attrs.st_atime = attrs.st_mtime = 0
+        return attrs
+
+    def remove(self, path):
+        if path not in self.files:
+            raise FileNotFoundError(2, "No such file")
+        del self.files[path]
+
+    def open(self, path, mode="r", bufsize=-1):
+        if "r" in mode:
+            if path not in self.files:
+                raise FileNotFoundError(2, "No such file")
+            self.read_files.append(FakeReadFile(self.files[path], self.read_cap))
+            return self.read_files[-1]
+        return FakeRemoteFile(self.files, path)
+
+    def utime(self, path, times):
+        pass
+
+    def chdir(self, path=None):
+        self.cwd = path
+
+    def mkdir(self, path, mode=511):
+        if path in self.dirs or path in self.files:
+            raise OSError("Failure")  # what paramiko raises for SFTP_FAILURE
+        if os.path.dirname(path) not in self.dirs:
+            raise FileNotFoundError(2, "No such file")
+        self.dirs.add(path)
+
+
+@pytest.fixture
+def cred():
+    return {
+        "sftp_host": "example.com",
+        "sftp_login": "user",
+        "sftp_passwd": "passwd",
+        "sftp_destination_path": "sftp://example.com/dest",
+        "sftp_https": "https://example.com/dest",
+    }
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    Patch the handshake with in-memory connections; `server.handshakes` counts them.
+    """
+    class Server:
+        def __init__(self):
+            self.files = {}
+            self.dirs = {"/"}
+            self.clients = []
+
+        @property
+        def handshakes(self):
+            return len(self.clients)
+
+    s = Server()
+
+    def fake_open(cred):
+        client = FakeSFTP(s.files, s.dirs)
+        s.clients.append(client)
+        return client
+
+    main.close_all()
+    monkeypatch.setattr(main, "_open", fake_open)
+    yield s
+    main.close_all()
+
+
+# ---------------------------------------------------------------------------
+# Connection reuse
+
+
+def test_one_handshake_across_calls(server, cred, tmp_path):
+    local = tmp_path / "a.txt"
+    local.write_text("hello")
+    address = "sftp://example.com/dest/a.txt"
+
+    assert not sftph.remote_file_exists(address, cred)
+    assert sftph.upload(str(local), cred, address) == address
+    assert sftph.remote_file_exists(address, cred)
+    assert server.files["/dest/a.txt"] == b"hello"
+    assert sftph.delete(address, cred)
+    assert not sftph.remote_file_exists(address, cred)
+    assert server.handshakes == 1
+
+
+def test_missing_file_keeps_pooled_connection(server, cred, tmp_path):
+    with pytest.raises(Exception):
+        sftph.download("sftp://example.com/dest/missing.txt", cred, str(tmp_path / "x.txt"))
+    assert sftph.remote_file_exists("sftp://example.com/dest/missing.txt", cred) is False
+    assert server.handshakes == 1
+    assert not server.clients[0].closed
+
+
+def test_pooled_connection_forgets_chdir(server, cred):
+    server.dirs.update({"/dest", "/other"})
+    with sftph.get_client_sftp(cred) as sftp:
+        sftp.chdir("/other")
+    with sftph.get_client_sftp(cred) as sftp:
+        assert sftp.cwd is None
+    assert sftph.remote_dir_exist("dest", cred)
+    assert server.handshakes == 1
+
+
+def test_broken_transport_is_not_pooled(server, cred):
+    with pytest.raises(EOFError):
+        with sftph.get_client_sftp(cred):
+            raise EOFError("connection dropped")
+    assert server.clients[0].closed
+    sftph.remote_file_exists("sftp://example.com/dest/a.txt", cred)
+    assert server.handshakes == 2
+
+
+def test_dead_pooled_connection_is_replaced(server, cred):
+    sftph.remote_file_exists("sftp://example.com/dest/a.txt", cred)
+    server.clients[0].transport.active = False
+    sftph.remote_file_exists("sftp://example.com/dest/a.txt", cred)
+    assert server.handshakes == 2
+    assert server.clients[0].closed
+
+
+def test_pool_keeps_at_most_max_idle(server, cred):
+    key = ("example.com", "user", False)
+    clients = [main._acquire(key, cred) for _ in range(main._POOL_MAX_IDLE + 2)]
+    for client in clients:
+        main._release(key, client)
+    assert len(main._POOL[key]) == main._POOL_MAX_IDLE
+    # The least recently released connections are the ones closed
+    assert [c.closed for c in clients] == [True, True] + [False] * main._POOL_MAX_IDLE
+
+
+def test_idle_connections_expire(server, cred):
+    key = ("example.com", "user", False)
+    client = main._acquire(key, cred)
+    main._release(key, client)
+    main._POOL[key] = [(client, time.monotonic() - main._POOL_IDLE_TIMEOUT - 1)]
+    assert main._acquire(key, cred) is not client
+    assert client.closed
+    assert server.handshakes == 2
+
+
+def test_pool_key_includes_compression(server, cred):
+    sftph.remote_file_exists("sftp://example.com/dest/a.txt", cred)
+    sftph.remote_file_exists("sftp://example.com/dest/a.txt", dict(cred, sftp_compress="true"))
+    sftph.remote_file_exists("sftp://example.com/dest/a.txt", dict(cred, sftp_compress="false"))
+    assert server.handshakes == 2
+
+
+# ---------------------------------------------------------------------------
+# Transfers and remote operations
+
+
+def test_destination_less_upload_is_deduplicated_across_runs(server, cred, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "blake3", None)  # osh.hashfile, whose date option hashes the current time
+    local = tmp_path / "a.txt"
+    local.write_text("hello")
+    first = sftph.upload(str(local), cred)
+    main._cached_content_hash.cache_clear()  # as in a new process...
+    time.sleep(1.1)  # ...started a second later
+    opened = []
+    monkeypatch.setattr(FakeSFTP, "open", lambda self, path, mode="r", bufsize=-1: opened.append(path))
+    assert sftph.upload(str(local), cred) == first
+    assert opened == []
+
+
+@pytest.mark.parametrize("backend", ["blake3", "osh"])
+def test_content_hash_depends_on_content_only(backend, tmp_path, monkeypatch):
+    if backend == "blake3":
+        monkeypatch.setattr(main, "blake3", pytest.importorskip("blake3"))
+    else:
+        monkeypatch.setattr(main, "blake3", None)
+    main._cached_content_hash.cache_clear()
+    a, b, c = tmp_path / "a.bin", tmp_path / "b.bin", tmp_path / "c.bin"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+    c.write_bytes(b"other")
+    first = main._content_hash(str(a))
+    time.sleep(1.1)  # a timestamped hash would change by now
+    assert main._content_hash(str(b)) == first
+    assert main._content_hash(str(c)) != first
+    main._cached_content_hash.cache_clear()
+
+
+def test_download_prefetches_from_read_capping_server(server, cred, tmp_path):
+    data = os.urandom(1 << 20)
+    server.files["/dest/big.bin"] = data
+    local = tmp_path / "big.bin"
+    # A large write block size must not leak into the read requests
+    assert sftph.download("sftp://example.com/dest/big.bin", dict(cred, sftp_block_size=256 << 10), str(local)) == str(local)
+    assert local.read_bytes() == data
+    remote_file = server.clients[0].read_files[0]
+    assert remote_file.prefetched == len(data) // remote_file.MAX_REQUEST_SIZE
+    assert remote_file.short_replies == 0
+
+
+def _mkdirs_counting(monkeypatch):
+    calls = []
+    mkdir = FakeSFTP.mkdir
+
+    def counting(self, path, mode=511):
+        calls.append(path)
+        return mkdir(self, path, mode)
+
+    monkeypatch.setattr(FakeSFTP, "mkdir", counting)
+    return calls
+
+
+def test_make_dirs_climbs_only_missing_levels(monkeypatch):
+    sftp = FakeSFTP({}, {"/", "/a"})
+    calls = _mkdirs_counting(monkeypatch)
+    main._make_dirs(sftp, "/a/b/c")
+    assert sftp.dirs == {"/", "/a", "/a/b", "/a/b/c"}
+    assert calls == ["/a/b/c", "/a/b", "/a/b/c"]
+    calls.clear()
+    main._make_dirs(sftp, "/a/b/c")  # already there
+    assert calls == ["/a/b/c"]
+
+
+def test_make_dirs_tolerates_concurrent_creation(monkeypatch):
+    sftp = FakeSFTP({}, {"/"})
+    mkdir = FakeSFTP.mkdir
+
+    def racing(self, path, mode=511):
+        mkdir(self, path, mode)
+        if path == "/a":
+            self.dirs.add("/a/b")  # another client creates the leaf meanwhile
+
+    monkeypatch.setattr(FakeSFTP, "mkdir", racing)
+    main._make_dirs(sftp, "/a/b")
+    assert "/a/b" in sftp.dirs
+
+
+def test_make_dirs_raises_over_a_file():
+    sftp = FakeSFTP({"/a": b""}, {"/"})
+    with pytest.raises(OSError):
+        main._make_dirs(sftp, "/a/b")
+    with pytest.raises(OSError):
+        main._make_dirs(sftp, "/a")
+
+
+def test_delete_before_put(server, cred, tmp_path, monkeypatch):
+    local = tmp_path / "a.txt"
+    local.write_text("new")
+    server.files["/dest/a.txt"] = b"old content"
+    calls = []
+    remove, open_ = FakeSFTP.remove, FakeSFTP.open
+
+    def recording_remove(self, path):
+        calls.append(("remove", path))
+        return remove(self, path)
+
+    def recording_open(self, path, mode="r", bufsize=-1):
+        calls.append(("open", path))
+        return open_(self, path, mode, bufsize)
+
+    monkeypatch.setattr(FakeSFTP, "remove", recording_remove)
+    monkeypatch.setattr(FakeSFTP, "open", recording_open)
+
+    sftph.upload(str(local), dict(cred, sftp_delete_before_put="false"), "sftp://example.com/dest/a.txt")
+    assert calls == [("open", "/dest/a.txt")]
+    calls.clear()
+    sftph.upload(str(local), dict(cred, sftp_delete_before_put="true"), "sftp://example.com/dest/a.txt")
+    assert calls == [("remove", "/dest/a.txt"), ("open", "/dest/a.txt")]
+    assert server.files["/dest/a.txt"] == b"new"
+
+
+@pytest.fixture
+def channels(server, monkeypatch):
+    """
+    SFTP channels opened by `_fan_out` on the pooled transport, as FakeSFTP clients sharing the server files.
+    """
+    opened = []
+
+    def from_transport(transport):
+        channel = FakeSFTP(server.files, server.dirs)
+        channel.transport = transport
+        opened.append(channel)
+        return channel
+
+    monkeypatch.setattr(paramiko.SFTPClient, "from_transport", staticmethod(from_transport))
+    return opened
+
+
+def test_upload_many_fans_out_over_one_connection(server, channels, cred, tmp_path):
+    pairs = []
+    for i in range(20):
+        local = tmp_path / f"{i}.txt"
+        local.write_text(str(i))
+        pairs.append((str(local), f"sftp://example.com/dest/{i}.txt"))
+    assert sftph.upload_many(pairs, dict(cred, sftp_parallel="3")) == [address for _, address in pairs]
+    assert server.handshakes == 1
+    assert 1 <= len(channels) <= 3
+    assert all(channel.transport is server.clients[0].transport for channel in channels)
+    assert all(channel.closed for channel in channels)
+    assert not server.clients[0].closed
+    assert sorted(server.files) == sorted(f"/dest/{i}.txt" for i in range(20))
+
+
+def test_download_many_raises_after_the_other_transfers(server, channels, cred, tmp_path):
+    for i in range(5):
+        server.files[f"/dest/{i}.txt"] = str(i).encode()
+    pairs = [(f"sftp://example.com/dest/{i}.txt", str(tmp_path / f"{i}.txt")) for i in [0, 1, 9, 2, 3, 4]]
+    with pytest.raises(Exception, match="9.txt"):
+        sftph.download_many(pairs, cred)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{i}.txt" for i in range(5)]
+    assert all(channel.closed for channel in channels)
+    # A missing file is an ordinary error: the connection stays pooled
+    sftph.remote_file_exists("sftp://example.com/dest/0.txt", cred)
+    assert server.handshakes == 1
+
+
+# ---------------------------------------------------------------------------
+# Paths
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/a/b", "/a/b"),
+    ("a/b", "/a/b"),
+    ("/a/b/", "/a/b"),
+    ("/", "/"),
+    ("", "/"),
+])
+def test_normalize_path(path, expected):
+    assert main.normalize_path(path) == expected
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("sftp://example.com/folder/file.txt", "/folder/file.txt"),
+    ("sftp://user@example.com:2222/folder/", "/folder"),
+    ("example.com/folder/file.txt", "/folder/file.txt"),
+    ("/folder/file.txt", "/folder/file.txt"),
+    ("folder/file.txt", "/folder/file.txt"),
+    ("sftp://example.com", "/"),
+])
+def test_strip_sftp_path(cred, address, expected):
+    assert sftph.strip_sftp_path(address, cred) == expected
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("/d/x.tar", ""),
+    ("/d/x.tar.gz", "gz"),
+    ("/d/x.TGZ", "gz"),
+    ("/d/x.tar.zst", "zst"),
+    ("/d/x.tzst", "zst"),
+])
+def test_archive_compression(name, expected):
+    assert main._archive_compression(name) == expected
+
+
+def test_archive_compression_rejects_other_names():
+    with pytest.raises(ValueError):
+        main._archive_compression("/d/x.zip")
+
+
+# ---------------------------------------------------------------------------
+# Pipelined requests
+
+
+def _reply(build):
+    msg = Message()
+    build(msg)
+    return Message(msg.asbytes())  # read from the start, as paramiko hands replies over
+
+
+class PipelineClient:
+    """
+    Fake of the paramiko.SFTPClient request internals used by `_pipelined`.
+
+    Replies are answered newest first, to check they are matched back by request number.
+    """
+
+    _convert_status = paramiko.SFTPClient._convert_status
+
+    def __init__(self, files):
+        self.files = files
+        self.pending = []
+        self.max_in_flight = 0
+        self.number = 0
+
+    def _adjust_cwd(self, path):
+        return path.encode()
+
+    def _async_request(self, fileobj, t, path):
+        self.number += 1
+        self.pending.append((fileobj, t, path.decode(), self.number))
+        self.max_in_flight = max(self.max_in_flight, len(self.pending))
+        return self.number
+
+    def _read_response(self):
+        fileobj, t, path, num = self.pending.pop()
+        if t == CMD_STAT and path in self.files:
+            attrs = paramiko.SFTPAttributes()
+            attrs.st_size = self.files[path]
+            fileobj._async_response(CMD_ATTRS, _reply(attrs._pack), num)
+        else:
+            code = SFTP_NO_SUCH_FILE if path not in self.files else SFTP_OK
+            if code == SFTP_OK:
+                del self.files[path]
+
+            def status(msg):
+                msg.add_int(code)
+                msg.add_string("")
+                msg.add_string("")
+            fileobj._async_response(CMD_STATUS, _reply(status), num)
+
+
+def test_pipelined_bounds_in_flight_requests():
+    client = PipelineClient({})
+    paths = [f"/p{i}" for i in range(10)]
+    replies = main._pipelined(client, CMD_STAT, paths, window=3)
+    assert len(replies) == 10
+    assert client.max_in_flight == 3
+    assert not client.pending
+
+
+def test_stat_many_keeps_order():
+    client = PipelineClient({"/a": 1, "/c": 3})
+    attrs = main._stat_many(client, ["/a", "/b", "/c"])
+    assert [a.st_size if a is not None else None for a in attrs] == [1, None, 3]
+
+
+def test_delete_many_ignores_missing():
+    files = {"/a": 1, "/b": 2}
+    client = PipelineClient(files)
+    main._delete_many(client, ["/a", "/missing", "/b"])
+    assert files == {}
+
+
+# ---------------------------------------------------------------------------
+# Credentials and connection options
+
+
+@pytest.mark.parametrize("value, expected", [
+    (True, True), (False, False), ("true", True), ("Yes", True), ("1", True),
+    ("false", False), ("0", False), ("", False), (None, False),
+])
+def test_flag(value, expected):
+    assert main._flag({"key": value}, "key") is expected
+
+
+class RecordingSocket:
+    def __init__(self, *args):
+        self.options = {}
+
+    def setsockopt(self, level, option, value):
+        self.options[option] = value
+
+    def connect(self, address):
+        pass
+
+
+@pytest.mark.parametrize("extra, expected", [
+    ({}, {}),
+    ({"sftp_tcp_rcvbuf": "4194304"}, {socket.SO_RCVBUF: 4194304}),
+    ({"sftp_tcp_sndbuf": 1 << 20, "sftp_tcp_rcvbuf": 1 << 21}, {socket.SO_SNDBUF: 1 << 20, socket.SO_RCVBUF: 1 << 21}),
+])
+def test_socket_buffers_only_when_given(cred, monkeypatch, extra, expected):
+    monkeypatch.setattr(socket, "getaddrinfo", lambda *args, **kwargs: [(socket.AF_INET, socket.SOCK_STREAM, 0, "", ("127.0.0.1", 22))])
+    monkeypatch.setattr(socket, "socket", RecordingSocket)
+    sock = main._open_socket(dict(cred, **extra))
+    assert sock.options.pop(socket.TCP_NODELAY) == 1
+    assert sock.options == expected
+
+
+def test_dropped_handshakes_only_are_retried():
+    assert main._dropped_handshake(EOFError())
+    assert main._dropped_handshake(ConnectionResetError())
+    assert main._dropped_handshake(paramiko.SSHException("Error reading SSH protocol banner"))
+    assert not main._dropped_handshake(paramiko.SSHException("No existing session"))
+    assert not main._dropped_handshake(paramiko.AuthenticationException("Authentication failed."))
+    assert not main._dropped_handshake(ConnectionRefusedError())
+
+
+def test_folder_config_mtime_follows_files(tmp_path):
+    config = tmp_path / "sftp_config.json"
+    config.write_text("{}")
+    before = main._config_mtime(str(tmp_path))
+    config.write_text('{"sftp_host": "example.com"}')
+    future = before + 10
+    os.utime(config, (future, future))
+    assert main._config_mtime(str(tmp_path)) == future
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    """
+    A config file read by a patched `osh.get_config`; `config.loads` counts the reads.
+    """
+    class Config:
+        path = str(tmp_path / "sftp_config.json")
+        loads = 0
+        writes = 0
+        fail = False
+
+        def write(self, host):
+            with open(self.path, "w") as f:
+                f.write(host)
+            # Distinct modification times, whatever the filesystem resolution
+            self.writes += 1
+            mtime = time.time() + self.writes
+            os.utime(self.path, (mtime, mtime))
+
+    c = Config()
+
+    def get_config(keys, config_type, path):
+        c.loads += 1
+        if c.fail:
+            raise SystemExit("invalid configuration")
+        with open(path) as f:
+            return {"sftp_host": f.read(), "sftp_login": "user", "sftp_passwd": "",
+                    "sftp_destination_path": "/", "sftp_https": ""}
+
+    monkeypatch.setattr(main.osh, "get_config", get_config)
+    main._CREDENTIALS_CACHE.clear()
+    c.write("first.example.com")
+    yield c
+    main._CREDENTIALS_CACHE.clear()
+
+
+def _wait_for_refresh():
+    for _ in range(200):
+        with main._CREDENTIALS_LOCK:
+            if not main._CREDENTIALS_REFRESHING:
+                return
+        time.sleep(0.01)
+    raise AssertionError("credentials refresh did not finish")
+
+
+def test_credentials_are_cached(config):
+    assert sftph.credentials(config.path)["sftp_host"] == "first.example.com"
+    sftph.credentials(config.path)["sftp_host"] = "mutated"  # callers get copies
+    assert sftph.credentials(config.path)["sftp_host"] == "first.example.com"
+    assert config.loads == 1
+
+
+def test_credentials_refresh_in_the_background(config):
+    sftph.credentials(config.path)
+    config.write("second.example.com")
+    # The stale value is served at once, the new one once the refresh is done
+    assert sftph.credentials(config.path)["sftp_host"] in ("first.example.com", "second.example.com")
+    _wait_for_refresh()
+    assert sftph.credentials(config.path)["sftp_host"] == "second.example.com"
+    assert config.loads == 2
+
+
+def test_failed_refresh_keeps_credentials_and_is_not_retried(config):
+    sftph.credentials(config.path)
+    config.fail = True
+    config.write("broken")
+    sftph.credentials(config.path)
+    _wait_for_refresh()
+    for _ in range(3):
+        assert sftph.credentials(config.path)["sftp_host"] == "first.example.com"
+    _wait_for_refresh()
+    assert config.loads == 2
+    config.fail = False
+    config.write("third.example.com")
+    sftph.credentials(config.path)
+    _wait_for_refresh()
+    assert sftph.credentials(config.path)["sftp_host"] == "third.example.com"
+
+
+def test_optional_credentials_from_environment(monkeypatch):
+    monkeypatch.setattr(main.osh, "get_config", lambda keys, config_type, path: {key: "" for key in keys})
+    monkeypatch.setenv("SFTP_COMPRESS", "false")
+    monkeypatch.setenv("SFTP_BLOCK_SIZE", "65536")
+    main._CREDENTIALS_CACHE.clear()
+    cred = sftph.credentials()
+    main._CREDENTIALS_CACHE.clear()
+    assert cred["sftp_block_size"] == "65536"
+    assert main._compression(cred) is False
+
+
+class FakeAuthTransport:
+    """
+    SSH transport accepting `accepted` keys and `password`, dropping the session after `max_tries` rejections.
+    """
+
+    def __init__(self, accepted=(), password="passwd", max_tries=6):
+        self.accepted = accepted
+        self.password = password
+        self.max_tries = max_tries
+        self.active = True
+        self.attempts = []
+
+    def _reject(self):
+        if len(self.attempts) >= self.max_tries:
+            self.active = False
+        raise paramiko.AuthenticationException("Authentication failed.")
+
+    def auth_publickey(self, login, key):
+        if not self.active:
+            raise paramiko.SSHException("No existing session")
+        self.attempts.append(key)
+        if key not in self.accepted:
+            self._reject()
+
+    def auth_password(self, login, password):
+        if not self.active:
+            raise paramiko.SSHException("No existing session")
+        self.attempts.append(("password", password))
+        if password != self.password:
+            self._reject()
+
+    def is_active(self):
+        return self.active
+
+    def set_keepalive(self, interval):
+        pass
+
+    def close(self):
+        self.active = False
+
+
+@pytest.fixture
+def handshakes(monkeypatch):
+    """
+    Patch the SSH layer under `_open`: `handshakes.started` lists the transports it
+    starts, each made by the `handshakes.transport` factory, and the agent holds three keys.
+    """
+    class Handshakes:
+        def __init__(self):
+            self.started = []
+            self.transport = FakeAuthTransport
+
+    class Agent:
+        def get_keys(self):
+            return ["key1", "key2", "key3"]
+
+        def close(self):
+            pass
+
+    h = Handshakes()
+
+    def start_transport(cred):
+        h.started.append(h.transport())
+        return h.started[-1]
+
+    monkeypatch.setattr(main, "_start_transport", start_transport)
+    monkeypatch.setattr(paramiko, "Agent", Agent)
+    monkeypatch.setattr(paramiko.SFTPClient, "from_transport", staticmethod(lambda transport: transport))
+    return h
+
+
+def test_password_login_skips_agent_keys(handshakes, cred):
+    transport = main._open(cred)
+    assert transport.attempts == [("password", "passwd")]
+    assert len(handshakes.started) == 1
+
+
+def test_agent_keys_without_password(handshakes, cred):
+    handshakes.transport = lambda: FakeAuthTransport(accepted=["key2"])
+    transport = main._open(dict(cred, sftp_passwd=""))
+    assert transport.attempts == ["key1", "key2"]
+
+
+def test_agent_first_falls_back_to_password(handshakes, cred):
+    transport = main._open(dict(cred, sftp_use_agent="true"))
+    assert transport.attempts == ["key1", "key2", "key3", ("password", "passwd")]
+    assert len(handshakes.started) == 1
+
+
+def test_password_on_fresh_transport_after_dropped_session(handshakes, cred):
+    handshakes.transport = lambda: FakeAuthTransport(max_tries=2)
+    transport = main._open(dict(cred, sftp_use_agent="yes"))
+    first, second = handshakes.started
+    assert first.attempts == ["key1", "key2"] and not first.active
+    assert transport is second and second.attempts == [("password", "passwd")]
+
+
+def test_failed_authentication_closes_transport(handshakes, cred):
+    with pytest.raises(paramiko.AuthenticationException):
+        main._open(dict(cred, sftp_passwd="wrong"))
+    assert not handshakes.started[0].active
+
+
+# ---------------------------------------------------------------------------
+# asyncio
+
+
+class FakeAsyncClient:
+    """
+    In-memory stand-in for asyncssh.SFTPClient, recording the transfers.
+    """
+
+    def __init__(self, asyncssh):
+        self._asyncssh = asyncssh
+        self.files = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def stat(self, path):
+        if path not in self.files:
+            raise self._asyncssh.SFTPNoSuchFile("No such file")
+        return self._asyncssh.SFTPAttrs(size=self.files[path])
+
+    async def put(self, local_path, remote_path, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.files[remote_path] = os.path.getsize(local_path)
+        self.in_flight -= 1
+
+    async def utime(self, path, times):
+        pass
+
+
+@pytest.fixture
+def async_session(cred):
+    asyncssh = pytest.importorskip("asyncssh")
+    session = async_main.AsyncSFTP(cred)
+    session._sftp = FakeAsyncClient(asyncssh)
+    return session
+
+
+def test_upload_async_hashes_off_the_event_loop(async_session, tmp_path, monkeypatch):
+    local = tmp_path / "a.txt"
+    local.write_text("hello")
+    threads = []
+
+    def default_address(local_path, cred):
+        threads.append(threading.get_ident())
+        return main._default_sftp_address(local_path, cred)
+
+    monkeypatch.setattr(async_main, "_default_sftp_address", default_address)
+    address = asyncio.run(async_session.upload_async(str(local)))
+    assert address.startswith("sftp://example.com/dest/")
+    assert threads and threads[0] != threading.get_ident()
+
+
+@pytest.mark.parametrize("parallel, expected", [(None, 8), ("3", 3)])
+def test_upload_many_async_is_bounded(async_session, tmp_path, parallel, expected):
+    if parallel is not None:
+        async_session._cred = dict(async_session._cred, sftp_parallel=parallel)
+    pairs = []
+    for i in range(20):
+        local = tmp_path / f"{i}.txt"
+        local.write_text(str(i))
+        pairs.append((str(local), f"sftp://example.com/dest/{i}.txt"))
+    assert asyncio.run(async_session.upload_many_async(pairs)) == [address for _, address in pairs]
+    assert async_session._sftp.max_in_flight == expected
+    assert len(async_session._sftp.files) == 20